@@ -2,70 +2,129 @@
 Загрузка и валидация конфигурации из .env файла.
 """
 
+import functools
 import os
+from dataclasses import MISSING, dataclass, field, fields
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from dotenv import load_dotenv
-from pydantic import AnyHttpUrl, BaseModel, Field, field_validator
-from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from .utils import Utils
 
-class Settings(BaseSettings):
+
+# Приведение строковых значений окружения к типам полей Settings
+_COERCERS = {
+    bool: Utils.as_bool,
+    int: int,
+    Path: Path,
+}
+
+
+@dataclass(slots=True, frozen=True)
+class Settings:
     """Конфигурация приложения с валидацией полей."""
-    
+
     # Настройки Telegram
     TG_BOT_TOKEN: str
-    
+
     # Настройки базы данных
     DB_PATH: Path
-    
+
+    # Настройки Speech-to-Text
+    VOSK_MODEL_PATH: Path
+
+    # Короткие фразы через запятую для быстрого распознавания коротких
+    # голосовых с ограниченным словарем (пусто - отключено)
+    VOSK_GRAMMAR: str = ""
+
     # Настройки LLM
     USE_LOCAL_LLM: bool = True
     OLLAMA_BASE_URL: Optional[str] = "http://127.0.0.1:11434"
     OLLAMA_MODEL: Optional[str] = "mistral"
+    OLLAMA_KEEP_ALIVE: str = "30m"  # Сколько Ollama держит модель загруженной
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_MODEL: Optional[str] = "gpt-3.5-turbo"
-    
+
     # Параметры суммаризации
     SUMMARY_DEVIATION_PERCENT: int = 20
     SUMMARY_MAX_TRIES: int = 2
-    
-    # Настройки Speech-to-Text
-    VOSK_MODEL_PATH: Path
-    
+
+    # Ограничения параллельной обработки голосовых сообщений: отдельно для
+    # распознавания и суммаризации (0 - автоматически: половина ядер CPU
+    # для STT и 4 запроса для LLM)
+    MAX_CONCURRENT_STT: int = 0
+    MAX_CONCURRENT_LLM: int = 0
+
+    # Ограничения на голосовые сообщения: более длинные или тяжелые
+    # отклоняются без скачивания и распознавания (0 - без ограничения).
+    # 20 МБ - предел скачивания файлов через Bot API
+    MAX_VOICE_SECONDS: int = 600
+    MAX_VOICE_BYTES: int = 20 * 1024 * 1024
+
+    # Webhook: если WEBHOOK_URL задан, Telegram сам доставляет обновления
+    # на этот публичный адрес; иначе бот работает через long polling
+    WEBHOOK_URL: Optional[str] = None
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_SECRET_TOKEN: Optional[str] = None
+
     # Прочие настройки
-    LOG_PATH: Path = Field(default=Path("logs/bot.log"))
+    LOG_PATH: Path = field(default=Path("logs/bot.log"))
     LOG_LEVEL: str = "INFO"
-    
-    # Валидаторы
-    @field_validator("OLLAMA_BASE_URL")
-    def validate_ollama_url(cls, v: Optional[str], info: dict) -> Optional[str]:
-        """Проверяет URL Ollama, если используется локальная LLM."""
-        if info.data.get("USE_LOCAL_LLM", True) and not v:
+
+    @property
+    def vosk_grammar_phrases(self) -> List[str]:
+        """Список фраз из VOSK_GRAMMAR без пустых элементов."""
+        return [p.strip() for p in self.VOSK_GRAMMAR.split(",") if p.strip()]
+
+    def __post_init__(self) -> None:
+        """Проверяет параметры выбранного бэкенда LLM и ограничения."""
+        if self.USE_LOCAL_LLM and not self.OLLAMA_BASE_URL:
             raise ValueError("OLLAMA_BASE_URL должен быть указан при USE_LOCAL_LLM=True")
-        return v
-    
-    @field_validator("OPENAI_API_KEY")
-    def validate_openai_key(cls, v: Optional[str], info: dict) -> Optional[str]:
-        """Проверяет ключ OpenAI, если используется облачная LLM."""
-        if not info.data.get("USE_LOCAL_LLM", True) and not v:
+        if not self.USE_LOCAL_LLM and not self.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY должен быть указан при USE_LOCAL_LLM=False")
-        return v
-    
-    model_config = SettingsConfigDict(
-        env_file=".env", 
-        env_file_encoding="utf-8",
-        case_sensitive=True,
-    )
+        if self.MAX_CONCURRENT_STT < 0 or self.MAX_CONCURRENT_LLM < 0:
+            raise ValueError("MAX_CONCURRENT_STT и MAX_CONCURRENT_LLM не могут быть отрицательными")
+        if self.MAX_VOICE_SECONDS < 0 or self.MAX_VOICE_BYTES < 0:
+            raise ValueError("MAX_VOICE_SECONDS и MAX_VOICE_BYTES не могут быть отрицательными")
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """
+        Создает настройки из переменных окружения.
+
+        Returns:
+            Settings: Объект с валидированными настройками
+        """
+        values = {}
+        for f in fields(cls):
+            raw = os.environ.get(f.name)
+            if raw is None:
+                if f.default is MISSING and f.default_factory is MISSING:
+                    raise ValueError(f"Переменная окружения {f.name} должна быть указана")
+                continue
+            coerce = _COERCERS.get(f.type)
+            if coerce is None:
+                values[f.name] = raw
+                continue
+            try:
+                values[f.name] = coerce(raw)
+            except ValueError:
+                raise ValueError(f"Некорректное значение {f.name}: {raw!r}") from None
+        return cls(**values)
 
 
+@functools.lru_cache(maxsize=1)
 def load_settings() -> Settings:
     """
     Загружает настройки из .env файла.
-    
+
+    В рамках процесса результат кэшируется; для повторного чтения
+    используйте load_settings.cache_clear().
+
     Returns:
         Settings: Объект с валидированными настройками
     """
     load_dotenv()
-    return Settings() 
\ No newline at end of file
+    return Settings.from_env()
@@ -32,6 +32,8 @@ MSG_HELP = """
 Чтобы отредактировать резюме или добавить примечание, просто ответь на сообщение с резюме своим вариантом текста.
 """
 
+MSG_VOICE_TOO_LONG = "❗️ Слишком длинное голосовое сообщение: {duration} с, лимит {limit} с."
+MSG_VOICE_TOO_LARGE = "❗️ Файл голосового сообщения слишком большой."
 MSG_DATE_FORMAT_ERROR = "❗️ Неверный формат даты. Используйте YYYY-MM-DD"
 MSG_NO_SUMMARIES_FOR_DATE = "ℹ️ Нет резюме за {date_str}."
 MSG_DELETE_SUCCESS = "✅ Запись #{record_id} удалена."
@@ -39,17 +41,12 @@ MSG_DELETE_NOT_FOUND = "❓ Запись не найдена."
 MSG_EDIT_OR_ADD_NOTE_PROMPT = "Что вы хотите сделать с текстом?"
 MSG_SUMMARY_UPDATED = "✅ Резюме обновлено."
 MSG_NOTE_ADDED = "✅ Примечание добавлено."
-MSG_VOICE_PROCESSING = "🔄 Обрабатываю голосовое сообщение..."
 
 # Текст для кнопок
 BUTTON_TEXT_EDIT_SUMMARY = "Изменить резюме"
 BUTTON_TEXT_ADD_NOTE = "Добавить примечание"
 BUTTON_TEXT_CANCEL = "Отмена"
 
-# Шаблоны для форматирования
-SUMMARY_REPLY_HEADER_TEMPLATE = "#{record_id}\n📌 Резюме:\n```\n{summary}\n```"
-SUMMARY_FOR_DATE_LINE_TEMPLATE = "{sent_at} — #{record_id}: {summary}"
-SUMMARY_FOR_DATE_NOTE_TEMPLATE = " └ Примечание: {note}"
-
-# ID для машины состояний ConversationHandler
-STATE_AWAITING_CHOICE = 1 
\ No newline at end of file
+# Шаблоны для форматирования (разметка HTML; подставляемый текст экранируется).
+# Ответ начинается с "#ID" - по нему определяется запись при ответе на сообщение
+SUMMARY_REPLY_HEADER_TEMPLATE = "<b>#{record_id}</b>\n📌 Резюме:\n<pre>{summary}</pre>"
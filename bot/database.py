@@ -2,18 +2,43 @@
 Модуль для работы с базой данных SQLite.
 """
 
+import datetime
 import logging
+import queue
 import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Tuple, Union
+from typing import Iterator, List, Optional, Tuple, Union
 
 from .utils import Utils
 
+_STOP = object()  # Сигнал остановки потока записи
+
 
 class Database:
     """
     Обертка для работы с базой данных.
     Скрывает специфику SQL-диалекта и предоставляет типизированный интерфейс.
+
+    Запись идет через одно соединение под блокировкой, чтение - через
+    соединения только для чтения, по одному на поток (WAL позволяет читать
+    параллельно с записью). Новые сообщения сохраняет фоновый поток записи,
+    объединяя накопившиеся в очереди сохранения в одну транзакцию.
+    """
+
+    BULK_CHUNK_SIZE = 500  # Количество строк в одном вызове executemany
+    WRITE_BATCH_SIZE = 64  # Максимум сохранений в одной транзакции потока записи
+    CACHED_STATEMENTS = 256  # Размер кэша подготовленных выражений на соединение
+
+    # PRAGMA уровня соединения: применяются к каждому новому соединению
+    _PRAGMAS_SQL = """
+    PRAGMA busy_timeout = 10000;    -- ждем 10 секунд при блокировке
+    PRAGMA synchronous = NORMAL;    -- под WAL безопасно, без fsync на каждый commit
+    PRAGMA temp_store = MEMORY;
+    PRAGMA cache_size = -65536;     -- кэш страниц 64 МБ
+    PRAGMA mmap_size = 268435456;   -- отображение файла в память, 256 МБ
     """
 
     _CREATE_TABLE_SQL = """
@@ -28,22 +53,253 @@ class Database:
         username          TEXT
     );"""
 
+    # Покрывающий индекс для выборки сводки за день без сортировки
+    _CREATE_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_vm_sent_at
+        ON voice_messages(sent_at, id, summarized, note);"""
+
+    _UPSERT_SQL = """
+    INSERT INTO voice_messages
+        (telegram_file_id, text, summarized, sent_at, user_id, username)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(telegram_file_id) DO UPDATE SET
+        text=excluded.text,
+        summarized=excluded.summarized,
+        sent_at=excluded.sent_at,
+        user_id=excluded.user_id,
+        username=excluded.username;"""
+
+    _FETCH_BY_ID_SQL = "SELECT * FROM voice_messages WHERE id = ?;"
+
+    _FETCH_BY_FILE_ID_SQL = "SELECT * FROM voice_messages WHERE telegram_file_id = ?;"
+
+    _FETCH_SUMMARIES_BY_DATE_SQL = """
+    SELECT id, sent_at, summarized, note
+      FROM voice_messages
+     WHERE sent_at >= ? AND sent_at < ?
+  ORDER BY sent_at ASC, id ASC;"""
+
+    _DELETE_BY_ID_SQL = "DELETE FROM voice_messages WHERE id = ?;"
+
+    _DELETE_BY_FILE_ID_SQL = "DELETE FROM voice_messages WHERE telegram_file_id = ?;"
+
+    _UPDATE_SUMMARY_SQL = "UPDATE voice_messages SET summarized = ? WHERE id = ?;"
+
+    _UPDATE_NOTE_SQL = "UPDATE voice_messages SET note = ? WHERE id = ?;"
+
+    _INSERT_SQL = """
+    INSERT INTO voice_messages
+        (telegram_file_id, text, summarized, sent_at, user_id, username)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(telegram_file_id) DO NOTHING;"""
+
+    _UPDATE_BY_FILE_ID_SQL = """
+    UPDATE voice_messages
+       SET text = ?, summarized = ?, sent_at = ?, user_id = ?, username = ?
+     WHERE telegram_file_id = ?
+    RETURNING id;"""
+
     def __init__(self, path: Union[str, Path]):
         """
-        Инициализирует соединение с базой данных.
+        Инициализирует соединения с базой данных.
         
         Args:
             path: Путь к файлу базы данных SQLite
         """
         path = Path(path)
         Utils.ensure_parent(path)
-        self.conn = sqlite3.connect(path, check_same_thread=False)
-        self.conn.execute("PRAGMA journal_mode=WAL;")  # лучшая параллельность
-        self.conn.execute("PRAGMA busy_timeout = 10000;")  # ждем 10 секунд при блокировке
-        self.conn.execute(self._CREATE_TABLE_SQL)
-        self.conn.commit()
+
+        # Соединение для записи: транзакции открываем явно (BEGIN IMMEDIATE)
+        self._writer = sqlite3.connect(
+            path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=self.CACHED_STATEMENTS,
+        )
+        # PRAGMA и схема отправляются одним скриптом, до любой транзакции
+        self._writer.executescript(
+            "PRAGMA journal_mode=WAL;"  # лучшая параллельность
+            "PRAGMA wal_autocheckpoint=1000;"  # checkpoint каждые 1000 страниц
+            + self._PRAGMAS_SQL
+            + self._CREATE_TABLE_SQL
+            + self._CREATE_INDEX_SQL
+        )
+        self._writer.row_factory = sqlite3.Row
+        self._write_lock = threading.RLock()
+        # Глубина вложенности transaction() и поток, открывший транзакцию;
+        # меняются только под _write_lock
+        self._tx_depth = 0
+        self._tx_owner: Optional[int] = None
+
+        # Соединения только для чтения создаются лениво, по одному на поток
+        self._ro_uri = f"{path.resolve().as_uri()}?mode=ro"
+        self._tls = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+        # Поток записи: сохранения из очереди выполняются пачками
+        self._write_queue: queue.Queue = queue.Queue()
+        # После close() новые сохранения не принимаются: _STOP должен быть
+        # последним элементом очереди, иначе вызов ждал бы результата вечно
+        self._closed = False
+        self._queue_lock = threading.Lock()
+        self._write_thread = threading.Thread(
+            target=self._write_loop, name="sqlite-writer", daemon=True
+        )
+        self._write_thread.start()
+
         logging.info("Подключено к SQLite БД по пути %s", path)
 
+    def _configure_connection(self, conn: sqlite3.Connection) -> None:
+        """
+        Применяет PRAGMA-настройки, действующие в рамках одного соединения.
+
+        Вызывается для каждого нового соединения с БД.
+
+        Args:
+            conn: Соединение с базой данных SQLite
+        """
+        conn.executescript(self._PRAGMAS_SQL)
+        conn.row_factory = sqlite3.Row  # доступ к полям по имени без распаковки
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Открывает транзакцию записи (BEGIN IMMEDIATE) на соединении-писателе.
+
+        Позволяет объединить несколько изменений в один commit. Методы записи
+        внутри блока присоединяются к уже открытой транзакции вместо
+        собственного commit.
+
+        Yields:
+            sqlite3.Connection: Соединение для записи
+        """
+        with self._write_lock:
+            if self._tx_depth:
+                # Вложенный вызов - работаем в рамках внешней транзакции
+                self._tx_depth += 1
+                try:
+                    yield self._writer
+                finally:
+                    self._tx_depth -= 1
+                return
+            # В режиме autocommit управляющие команды выполняются как обычные
+            # выражения и берутся из кэша подготовленных выражений
+            self._writer.execute("BEGIN IMMEDIATE")
+            self._tx_depth = 1
+            self._tx_owner = threading.get_ident()
+            try:
+                yield self._writer
+                self._writer.execute("COMMIT")
+            except BaseException:
+                # Неудачный COMMIT (SQLITE_BUSY, нет места) тоже откатываем.
+                # SQLite мог уже откатить транзакцию сам - тогда ROLLBACK
+                # завершился бы ошибкой и скрыл исходную
+                if self._writer.in_transaction:
+                    self._writer.execute("ROLLBACK")
+                raise
+            finally:
+                self._tx_depth = 0
+                self._tx_owner = None
+
+    def _reader(self) -> sqlite3.Connection:
+        """
+        Возвращает соединение для чтения, закрепленное за текущим потоком.
+
+        Returns:
+            sqlite3.Connection: Соединение только для чтения
+        """
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self._ro_uri,
+                uri=True,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=self.CACHED_STATEMENTS,
+            )
+            self._configure_connection(conn)
+            self._tls.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def _write_loop(self) -> None:
+        """
+        Цикл потока записи.
+
+        Ждет первое сохранение, забирает из очереди все накопившиеся (не более
+        WRITE_BATCH_SIZE) и записывает их одной транзакцией. Завершается
+        после получения _STOP.
+        """
+        q = self._write_queue
+        while True:
+            item = q.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stopping = False
+            while len(batch) < self.WRITE_BATCH_SIZE:
+                try:
+                    item = q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+            if stopping:
+                return
+
+    def _write_batch(self, batch: List[Tuple[Tuple, Future]]) -> None:
+        """
+        Сохраняет пачку сообщений в одной транзакции и выставляет результаты.
+
+        Args:
+            batch: Пары (значения для _INSERT_SQL, Future для ID записи)
+        """
+        try:
+            with self.transaction() as conn:
+                ids = [self._save_row(conn, row) for row, _ in batch]
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Транзакция пачки откачена: сохраняем строки по одной, чтобы
+            # ошибка одной строки досталась только ее вызывающему
+            logging.warning(
+                "Ошибка записи пачки из %d сообщений, сохраняем по одному: %s",
+                len(batch), e
+            )
+            for item in batch:
+                self._write_batch([item])
+            return
+        for (_, future), record_id in zip(batch, ids):
+            future.set_result(record_id)
+        logging.debug("Записана пачка сообщений: %d", len(batch))
+
+    def _save_row(self, conn: sqlite3.Connection, row: Tuple) -> Optional[int]:
+        """
+        Вставляет или обновляет одну запись внутри открытой транзакции.
+
+        Args:
+            conn: Соединение с открытой транзакцией записи
+            row: Кортеж (telegram_file_id, text, summary, sent_at, user_id, username)
+
+        Returns:
+            Optional[int]: ID записи в БД
+        """
+        # Обычный случай - новая запись: id берем из lastrowid без выборки
+        cursor = conn.execute(self._INSERT_SQL, row)
+        if cursor.rowcount == 1:
+            return cursor.lastrowid
+        telegram_file_id, *values = row
+        found = conn.execute(
+            self._UPDATE_BY_FILE_ID_SQL, (*values, telegram_file_id)
+        ).fetchone()
+        return found[0] if found else None
+
     def save_message(
         self,
         telegram_file_id: str,
@@ -56,6 +312,9 @@ class Database:
         """
         Сохраняет или обновляет запись голосового сообщения.
         
+        Запись выполняет поток записи; вызов блокируется до commit пачки,
+        в которую попало сообщение, поэтому его следует делать вне цикла событий.
+        
         Args:
             telegram_file_id: ID файла голосового сообщения в Telegram
             text: Полный текст транскрипции
@@ -66,30 +325,47 @@ class Database:
         
         Returns:
             int: ID записи в БД
+            
+        Raises:
+            RuntimeError: Если база данных уже закрыта
         """
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO voice_messages
-                (telegram_file_id, text, summarized, sent_at, user_id, username)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(telegram_file_id) DO UPDATE SET
-                text=excluded.text,
-                summarized=excluded.summarized,
-                sent_at=excluded.sent_at,
-                user_id=excluded.user_id,
-                username=excluded.username
-            RETURNING id;
-            """,
-            (telegram_file_id, text, summary, sent_at, user_id, username),
-        )
-        row = cursor.fetchone()
-        record_id = row[0] if row else None
-        self.conn.commit()
+        row = (telegram_file_id, text, summary, sent_at, user_id, username)
+        if self._tx_owner == threading.get_ident():
+            # Вызов внутри transaction(): поток записи ждал бы эту же блокировку
+            record_id = self._save_row(self._writer, row)
+        else:
+            future: Future = Future()
+            with self._queue_lock:
+                if self._closed:
+                    raise RuntimeError("База данных закрыта")
+                self._write_queue.put_nowait((row, future))
+            record_id = future.result()
         logging.debug("Сохранено сообщение %s с id=%s", telegram_file_id, record_id)
         return record_id
 
-    def fetch_record_by_id(self, record_id: int) -> Optional[Tuple]:
+    def save_messages_bulk(self, rows: List[Tuple]) -> None:
+        """
+        Сохраняет или обновляет пачку записей в одной транзакции.
+        
+        Args:
+            rows: Кортежи (telegram_file_id, text, summary, sent_at, user_id, username)
+        """
+        with self.transaction() as conn:
+            self._upsert_rows(conn, rows)
+        logging.debug("Сохранено сообщений пачкой: %d", len(rows))
+
+    def _upsert_rows(self, conn: sqlite3.Connection, rows: List[Tuple]) -> None:
+        """
+        Выполняет вставку/обновление строк порциями внутри открытой транзакции.
+        
+        Args:
+            conn: Соединение с открытой транзакцией записи
+            rows: Кортежи значений для _UPSERT_SQL
+        """
+        for start in range(0, len(rows), self.BULK_CHUNK_SIZE):
+            conn.executemany(self._UPSERT_SQL, rows[start:start + self.BULK_CHUNK_SIZE])
+
+    def fetch_record_by_id(self, record_id: int) -> Optional[sqlite3.Row]:
         """
         Получает запись по её ID.
         
@@ -97,14 +373,14 @@ class Database:
             record_id: ID записи в БД
             
         Returns:
-            Optional[Tuple]: Запись или None, если не найдена
+            Optional[sqlite3.Row]: Запись или None, если не найдена
         """
-        cursor = self.conn.execute(
-            "SELECT * FROM voice_messages WHERE id = ?", (record_id,)
-        )
+        cursor = self._reader().execute(self._FETCH_BY_ID_SQL, (record_id,))
         return cursor.fetchone()
 
-    def fetch_record_by_telegram_file_id(self, telegram_file_id: str) -> Optional[Tuple]:
+    def fetch_record_by_telegram_file_id(
+        self, telegram_file_id: str
+    ) -> Optional[sqlite3.Row]:
         """
         Получает запись по ID файла в Telegram.
         
@@ -112,33 +388,47 @@ class Database:
             telegram_file_id: ID файла в Telegram
             
         Returns:
-            Optional[Tuple]: Запись или None, если не найдена
+            Optional[sqlite3.Row]: Запись или None, если не найдена
         """
-        cursor = self.conn.execute(
-            "SELECT * FROM voice_messages WHERE telegram_file_id = ?", (telegram_file_id,)
-        )
+        cursor = self._reader().execute(self._FETCH_BY_FILE_ID_SQL, (telegram_file_id,))
         return cursor.fetchone()
 
-    def fetch_summaries_by_date(self, date_str: str) -> List[Tuple]:
+    @staticmethod
+    def _day_bounds(day: Union[str, datetime.date]) -> Tuple[str, str]:
         """
-        Возвращает список записей за указанную дату.
+        Возвращает границы полуинтервала [день, следующий день) для sent_at.
         
         Args:
-            date_str: Дата в формате YYYY-MM-DD
+            day: Дата в формате YYYY-MM-DD или объект date
             
         Returns:
-            List[Tuple]: Список кортежей (id, sent_at, summarized, note)
-        """
-        cursor = self.conn.execute(
-            """
-            SELECT id, sent_at, summarized, note
-              FROM voice_messages
-             WHERE sent_at LIKE ?
-          ORDER BY sent_at ASC
-            """,
-            (f"{date_str}%",)
-        )
-        return cursor.fetchall()
+            Tuple[str, str]: Нижняя (включительно) и верхняя (исключительно) границы
+        
+        Raises:
+            ValueError: Если строку не удалось разобрать как дату
+        """
+        if isinstance(day, str):
+            day = datetime.date.fromisoformat(day)
+        return day.isoformat(), (day + datetime.timedelta(days=1)).isoformat()
+
+    def fetch_summaries_by_date(
+        self, date_str: Union[str, datetime.date]
+    ) -> Iterator[sqlite3.Row]:
+        """
+        Возвращает записи за указанную дату по одной, не загружая весь день в память.
+        
+        Args:
+            date_str: Дата в формате YYYY-MM-DD или объект date
+            
+        Yields:
+            sqlite3.Row: Строки (id, sent_at, summarized, note)
+        """
+        # Сравнение по диапазону вместо LIKE дает прямой поиск по индексу
+        try:
+            bounds = self._day_bounds(date_str)
+        except ValueError:
+            return
+        yield from self._reader().execute(self._FETCH_SUMMARIES_BY_DATE_SQL, bounds)
 
     def delete_record_by_id(self, record_id: int) -> bool:
         """
@@ -150,10 +440,8 @@ class Database:
         Returns:
             bool: True если запись удалена, False если не найдена
         """
-        cursor = self.conn.execute(
-            "DELETE FROM voice_messages WHERE id = ?", (record_id,)
-        )
-        self.conn.commit()
+        with self.transaction() as conn:
+            cursor = conn.execute(self._DELETE_BY_ID_SQL, (record_id,))
         return cursor.rowcount > 0
 
     def delete_record_by_telegram_file_id(self, telegram_file_id: str) -> bool:
@@ -166,10 +454,8 @@ class Database:
         Returns:
             bool: True если запись удалена, False если не найдена
         """
-        cursor = self.conn.execute(
-            "DELETE FROM voice_messages WHERE telegram_file_id = ?", (telegram_file_id,)
-        )
-        self.conn.commit()
+        with self.transaction() as conn:
+            cursor = conn.execute(self._DELETE_BY_FILE_ID_SQL, (telegram_file_id,))
         return cursor.rowcount > 0
 
     def update_summary(self, record_id: int, new_summary: str) -> bool:
@@ -183,11 +469,8 @@ class Database:
         Returns:
             bool: True если запись обновлена, False если не найдена
         """
-        cursor = self.conn.execute(
-            "UPDATE voice_messages SET summarized = ? WHERE id = ?",
-            (new_summary, record_id)
-        )
-        self.conn.commit()
+        with self.transaction() as conn:
+            cursor = conn.execute(self._UPDATE_SUMMARY_SQL, (new_summary, record_id))
         return cursor.rowcount > 0
 
     def add_note_to_record(self, record_id: int, note: str) -> bool:
@@ -201,14 +484,19 @@ class Database:
         Returns:
             bool: True если примечание добавлено, False если запись не найдена
         """
-        cursor = self.conn.execute(
-            "UPDATE voice_messages SET note = ? WHERE id = ?",
-            (note, record_id)
-        )
-        self.conn.commit()
+        with self.transaction() as conn:
+            cursor = conn.execute(self._UPDATE_NOTE_SQL, (note, record_id))
         return cursor.rowcount > 0
 
     def close(self):
-        """Закрывает соединение с базой данных."""
-        if self.conn:
-            self.conn.close() 
\ No newline at end of file
+        """Дожидается записи очереди и закрывает все соединения с базой данных."""
+        with self._queue_lock:
+            self._closed = True
+            self._write_queue.put(_STOP)
+        self._write_thread.join()
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        if self._writer:
+            self._writer.close()
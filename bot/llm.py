@@ -3,19 +3,35 @@
 Поддерживает локальную Ollama и облачную OpenAI.
 """
 
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, Optional, Union
+import re
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+
+import aiohttp
 
-import requests
 from .constants import PROMPT_SUMMARY_TEMPLATE
 
 try:
-    import openai
-    OPENAI_AVAILABLE = True
+    import orjson
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    _json_loads = orjson.loads
 except ImportError:
-    OPENAI_AVAILABLE = False
-    
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+# Нормализация текста для ключа кэша резюме
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+_ERROR_SUMMARY = "Ошибка при генерации резюме. Пожалуйста, попробуйте позже."
+
 
 class LLMHandler:
     """
@@ -23,6 +39,13 @@ class LLMHandler:
     Скрывает различия между локальной Ollama и облачной OpenAI.
     """
 
+    POOL_MAXSIZE = 16  # Максимум одновременных соединений к Ollama
+    OLLAMA_TIMEOUT = 120  # Общий таймаут запроса к Ollama, секунд
+    # Буфер чтения ответа: последняя строка потока Ollama содержит массив
+    # context и для длинных текстов превышает стандартный лимит строки aiohttp
+    READ_BUFSIZE = 2 ** 20
+    SUMMARY_CACHE_SIZE = 1024  # Сколько последних резюме помнить для повторных текстов
+
     def __init__(self, use_local: bool, config: Dict[str, Union[str, bool, int]]):
         """
         Инициализирует обработчик LLM.
@@ -35,24 +58,81 @@ class LLMHandler:
         self.use_local = use_local
         self.config = config
         
+        # Постоянная HTTP-сессия: соединение с Ollama переиспользуется (keep-alive).
+        # aiohttp-сессия привязана к циклу событий, поэтому создается при первом запросе
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._url = f"{config.get('OLLAMA_BASE_URL')}/api/generate"
+        # Сколько Ollama держит модель в памяти после запроса (без повторной загрузки)
+        self._keep_alive = config.get("OLLAMA_KEEP_ALIVE") or "30m"
+        
+        # Параметры суммаризации читаем один раз
+        self._dev = int(config.get("SUMMARY_DEVIATION_PERCENT", 20)) / 100.0
+        self._max_tries = max(1, int(config.get("SUMMARY_MAX_TRIES", 2)))
+        
+        # LRU-кэш готовых резюме по SHA-256 нормализованного текста: повторная
+        # отправка того же текста (например, пересланное голосовое) не запускает
+        # генерацию заново. Используется только из цикла событий, без блокировки
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        
+        # Пакет openai тяжелый, поэтому импортируем его только при необходимости
+        self._openai = None
         if not use_local:
-            if not OPENAI_AVAILABLE:
+            try:
+                import openai
+            except ImportError:
                 raise RuntimeError(
                     "Пакет openai не установлен, но требуется для USE_LOCAL_LLM=False"
-                )
-            openai.api_key = str(config["OPENAI_API_KEY"])
+                ) from None
+            self._openai = openai.AsyncOpenAI(
+                api_key=str(config["OPENAI_API_KEY"]),
+                http_client=self._make_http2_client(),
+            )
         
         logging.info(
             "LLM Handler настроен на %s модель",
             "локальную Ollama" if use_local else "облачную OpenAI"
         )
 
-    def summarize(self, text: str) -> str:
+    @staticmethod
+    def _make_http2_client():
+        """
+        Создает HTTP/2-клиент для OpenAI, если установлены httpx и h2.
+        
+        Returns:
+            Optional[httpx.AsyncClient]: Клиент или None (клиент openai по умолчанию)
+        """
+        try:
+            import h2  # noqa: F401 - нужен httpx для HTTP/2
+            import httpx
+        except ImportError:
+            return None
+        return httpx.AsyncClient(http2=True, timeout=120)
+
+    @staticmethod
+    def _summary_cache_key(text: str) -> str:
+        """
+        Вычисляет ключ кэша резюме.
+        
+        Текст приводится к нижнему регистру, знаки препинания удаляются,
+        пробелы схлопываются - так совпадают тексты, различающиеся только
+        оформлением.
+        
+        Args:
+            text: Исходный текст
+            
+        Returns:
+            str: SHA-256 нормализованного текста в шестнадцатеричном виде
+        """
+        norm = _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", text.lower())).strip()
+        return hashlib.sha256(norm.encode()).hexdigest()
+
+    async def summarize(self, text: str) -> str:
         """
         Генерирует резюме текста с учетом ограничений длины.
         
-        При значительном отклонении длины результата от заданного диапазона
-        делается повторная попытка.
+        Попытки (SUMMARY_MAX_TRIES) выполняются параллельно: возвращается первый
+        результат, длина которого укладывается в допустимый диапазон.
+        Резюме допустимой длины кэшируются по нормализованному исходному тексту.
         
         Args:
             text: Исходный текст для суммаризации
@@ -60,9 +140,34 @@ class LLMHandler:
         Returns:
             str: Сгенерированное резюме
         """
-        # Получаем параметры из конфигурации
-        deviation_percent = int(self.config.get("SUMMARY_DEVIATION_PERCENT", 20))
-        max_tries = max(1, int(self.config.get("SUMMARY_MAX_TRIES", 2)))
+        key = self._summary_cache_key(text)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        
+        summary, in_range = await self._summarize_uncached(text)
+        
+        # Резюме вне диапазона длины и сообщение об ошибке не кэшируем,
+        # чтобы следующая попытка снова обратилась к модели
+        if in_range:
+            self._cache[key] = summary
+            if len(self._cache) > self.SUMMARY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return summary
+
+    async def _summarize_uncached(self, text: str) -> Tuple[str, bool]:
+        """
+        Генерирует резюме без обращения к кэшу.
+        
+        Args:
+            text: Исходный текст для суммаризации
+            
+        Returns:
+            Tuple[str, bool]: Сгенерированное резюме и признак того, что его
+            длина укладывается в допустимый диапазон
+        """
+        max_tries = self._max_tries
         
         # Определяем желаемую длину резюме в зависимости от длины исходного текста
         n = len(text)
@@ -72,90 +177,168 @@ class LLMHandler:
             min_len, max_len = max(150, n // 5), n // 3  # соотношения 5:1 и 3:1
         
         # Рассчитываем допуски
-        min_allowed = min_len * (1 - (deviation_percent / 100))
-        max_allowed = max_len * (1 + (deviation_percent / 100))
-        
-        # Функция для генерации резюме с выбранным бэкендом
-        def _generate() -> str:
-            prompt = PROMPT_SUMMARY_TEMPLATE.format(
-                min_len=min_len,
-                max_len=max_len,
-                text=text
-            )
-            return (
-                self._ollama_call(prompt)
-                if self.use_local
-                else self._openai_call(prompt)
-            ).strip()
-        
-        # Делаем попытки генерации
-        for attempt in range(max_tries):
-            summary = _generate()
-            length = len(summary)
+        min_allowed = min_len * (1 - self._dev)
+        max_allowed = max_len * (1 + self._dev)
+        
+        # Промпт одинаков для всех попыток - форматируем его один раз
+        prompt = PROMPT_SUMMARY_TEMPLATE.format(
+            min_len=min_len,
+            max_len=max_len,
+            text=text
+        )
+        
+        # Запускаем все попытки параллельно и берем первую подходящую по длине;
+        # оставшиеся попытки отменяются, что закрывает их потоковые запросы.
+        # Попытки, превысившие max_allowed, прерываются досрочно и дают
+        # обрезанный текст, поэтому первая попытка идет без ограничения:
+        # если ни одна не подойдет, ее полный ответ станет запасным результатом
+        call = self._ollama_call if self.use_local else self._openai_call
+        tasks = [asyncio.ensure_future(call(prompt))]
+        tasks += [
+            asyncio.ensure_future(call(prompt, max_chars=max_allowed))
+            for _ in range(max_tries - 1)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                summary, length = await next_done
+                if min_allowed <= length <= max_allowed:
+                    # Результат в пределах допустимого отклонения
+                    return summary, True
             
-            if min_allowed <= length <= max_allowed:
-                # Результат в пределах допустимого отклонения
-                break
-                
-            if attempt == max_tries - 1:
-                # Последняя попытка, примем как есть
-                logging.warning(
-                    "Длина резюме %d вне диапазона (%d-%d) даже после %d попыток",
-                    length, min_len, max_len, max_tries
-                )
+            # Ни одна попытка не подошла: к этому моменту все завершены,
+            # берем полный ответ попытки без ограничения длины
+            summary, length = tasks[0].result()
+            logging.warning(
+                "Длина резюме %d вне диапазона (%d-%d) даже после %d попыток",
+                length, min_len, max_len, max_tries
+            )
+            return summary, False
+        finally:
+            for task in tasks:
+                task.cancel()
 
-        return summary
+    def _get_http(self) -> aiohttp.ClientSession:
+        """
+        Возвращает HTTP-сессию для Ollama, создавая ее при первом обращении.
+        
+        Returns:
+            aiohttp.ClientSession: Сессия с пулом keep-alive соединений
+        """
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.POOL_MAXSIZE),
+                timeout=aiohttp.ClientTimeout(total=self.OLLAMA_TIMEOUT),
+                read_bufsize=self.READ_BUFSIZE,
+            )
+        return self._http
 
-    def _ollama_call(self, prompt: str) -> str:
+    async def _ollama_call(
+        self,
+        prompt: str,
+        max_chars: Optional[float] = None,
+    ) -> Tuple[str, int]:
         """
-        Вызывает локальную модель Ollama.
+        Вызывает локальную модель Ollama в потоковом режиме.
+        
+        Если накопленный ответ превысил max_chars, генерация прерывается:
+        такой результат все равно будет отклонен по длине. Остановка из-за
+        другой подходящей попытки выполняется отменой корутины.
         
         Args:
             prompt: Промт для модели
+            max_chars: Максимальная длина ответа, после которой чтение прекращается
             
         Returns:
-            str: Ответ модели
+            Tuple[str, int]: Ответ модели и его длина, подсчитанная при чтении потока
         """
-        url = f"{self.config['OLLAMA_BASE_URL']}/api/generate"
         payload = {
             "model": self.config["OLLAMA_MODEL"],
             "prompt": prompt,
-            "stream": False
+            "stream": True,
+            "keep_alive": self._keep_alive,
         }
         
-        logging.debug("Запрос к Ollama: %s", json.dumps(payload)[:200])
+        logging.debug("Запрос к Ollama: %s", _json_dumps(payload)[:200])
         
         try:
-            resp = requests.post(url, json=payload, timeout=120)
-            resp.raise_for_status()
-            summary = resp.json().get("response", "").strip()
-            logging.info("Ollama: резюме получено, длина=%d", len(summary))
-            return summary
-        except requests.exceptions.RequestException as e:
+            parts = []
+            length = 0
+            async with self._get_http().post(self._url, json=payload) as resp:
+                resp.raise_for_status()
+                # Ответ в формате NDJSON: один JSON-объект на строку
+                async for line in resp.content:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    chunk = _json_loads(line)
+                    piece = chunk.get("response", "")
+                    parts.append(piece)
+                    length += len(piece)
+                    if chunk.get("done"):
+                        break
+                    if max_chars is not None and length > max_chars:
+                        logging.debug("Ollama: генерация прервана на длине %d", length)
+                        break
+            raw = "".join(parts)
+            summary = raw.strip()
+            length -= len(raw) - len(summary)  # не учитываем обрезанные пробелы
+            logging.info("Ollama: резюме получено, длина=%d", length)
+            return summary, length
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
             logging.error("Ошибка при обращении к Ollama: %s", e)
-            return "Ошибка при генерации резюме. Пожалуйста, попробуйте позже."
+            return _ERROR_SUMMARY, len(_ERROR_SUMMARY)
 
-    def _openai_call(self, prompt: str) -> str:
+    async def _openai_call(
+        self,
+        prompt: str,
+        max_chars: Optional[float] = None,
+    ) -> Tuple[str, int]:
         """
-        Вызывает облачную модель OpenAI.
+        Вызывает облачную модель OpenAI в потоковом режиме.
+        
+        Прерывает чтение, если накопленный ответ превысил max_chars.
+        Остановка из-за другой подходящей попытки выполняется отменой корутины.
         
         Args:
             prompt: Промт для модели
+            max_chars: Максимальная длина ответа, после которой чтение прекращается
             
         Returns:
-            str: Ответ модели
+            Tuple[str, int]: Ответ модели и его длина
         """
         logging.debug("Запрос к OpenAI: длина=%d", len(prompt))
         
         try:
-            response = openai.ChatCompletion.create(
+            parts = []
+            length = 0
+            stream = await self._openai.chat.completions.create(
                 model=self.config["OPENAI_MODEL"],
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3,
+                stream=True,
             )
-            summary = response.choices[0].message.content.strip()
-            logging.info("OpenAI: резюме получено, длина=%d", len(summary))
-            return summary
+            async with stream:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    piece = chunk.choices[0].delta.content or ""
+                    parts.append(piece)
+                    length += len(piece)
+                    if max_chars is not None and length > max_chars:
+                        logging.debug("OpenAI: генерация прервана на длине %d", length)
+                        break
+            raw = "".join(parts)
+            summary = raw.strip()
+            length -= len(raw) - len(summary)  # не учитываем обрезанные пробелы
+            logging.info("OpenAI: резюме получено, длина=%d", length)
+            return summary, length
         except Exception as e:
             logging.error("Ошибка при обращении к OpenAI: %s", e)
-            return "Ошибка при генерации резюме. Пожалуйста, попробуйте позже." 
\ No newline at end of file
+            return _ERROR_SUMMARY, len(_ERROR_SUMMARY)
+
+    async def close(self) -> None:
+        """Закрывает HTTP-сессию Ollama и клиент OpenAI."""
+        if self._http is not None:
+            await self._http.close()
+        if self._openai is not None:
+            await self._openai.close()
@@ -2,8 +2,10 @@
 Точка входа в приложение VoiceMemo Assistant.
 """
 
+import dataclasses
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from .config import load_settings
@@ -20,7 +22,7 @@ def main():
     
     1. Загружает и валидирует настройки из .env
     2. Настраивает логирование
-    3. Инициализирует все подсистемы (БД, STT, LLM)
+    3. Параллельно инициализирует все подсистемы (БД, STT, LLM)
     4. Создает и запускает Telegram-бота
     """
     try:
@@ -36,20 +38,26 @@ def main():
         # Сообщаем о запуске
         logging.info("Запуск VoiceMemo Assistant v%s", "0.1.0")
         
-        # Инициализируем базу данных
-        db = Database(settings.DB_PATH)
-        logging.info("База данных инициализирована")
-        
-        # Инициализируем модуль распознавания речи
-        stt = SpeechToText(model_path=str(settings.VOSK_MODEL_PATH))
-        logging.info("Модуль распознавания речи инициализирован")
-        
-        # Инициализируем обработчик языковой модели
-        llm = LLMHandler(
-            use_local=settings.USE_LOCAL_LLM,
-            config=settings.model_dump()
-        )
-        logging.info("Обработчик LLM инициализирован")
+        # Инициализируем БД, STT и LLM параллельно: подсистемы независимы,
+        # а загрузка модели Vosk занимает большую часть времени старта
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            f_db = executor.submit(Database, settings.DB_PATH)
+            f_stt = executor.submit(
+                SpeechToText,
+                model_path=str(settings.VOSK_MODEL_PATH),
+                grammar=settings.vosk_grammar_phrases,
+            )
+            f_llm = executor.submit(
+                LLMHandler,
+                use_local=settings.USE_LOCAL_LLM,
+                config=dataclasses.asdict(settings),
+            )
+            db = f_db.result()
+            logging.info("База данных инициализирована")
+            stt = f_stt.result()
+            logging.info("Модуль распознавания речи инициализирован")
+            llm = f_llm.result()
+            logging.info("Обработчик LLM инициализирован")
         
         # Создаем и запускаем бота
         bot = TelegramBot(
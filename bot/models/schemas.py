@@ -3,7 +3,7 @@ Pydantic-модели для валидации данных.
 """
 
 from datetime import datetime
-from typing import Optional
+from typing import Any, Mapping, Optional
 
 from pydantic import BaseModel, Field
 
@@ -20,6 +20,19 @@ class VoiceMessage(BaseModel):
     user_id: int
     username: Optional[str] = None
 
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> "VoiceMessage":
+        """
+        Создает модель из строки БД без повторной валидации.
+
+        Args:
+            row: Строка таблицы voice_messages (например, sqlite3.Row)
+
+        Returns:
+            VoiceMessage: Модель голосового сообщения
+        """
+        return cls.model_construct(**dict(row))
+
 
 class SummaryItem(BaseModel):
     """Модель для элемента сводки резюме."""
@@ -2,15 +2,103 @@
 Модуль для преобразования голосовых сообщений в текст с использованием Vosk.
 """
 
+import functools
+import io
 import json
 import logging
-import tempfile
+import queue
+import threading
+from math import gcd
 from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Sequence, Union
 
-import resampy
+import numpy as np
 import soundfile as sf
+from scipy.signal import firwin, lfilter, resample_poly
 from vosk import KaldiRecognizer, Model
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# Слово грамматики Vosk, которым распознаются слова вне словаря
+_UNK = "[unk]"
+
+
+if njit is not None:
+    @njit("void(float32[:], int16[:])", cache=True, fastmath=True, nogil=True)
+    def _quantize_pcm16(data, out):
+        """Масштабирует, ограничивает и приводит отсчеты к int16 за один проход."""
+        for i in range(data.size):
+            v = data[i] * 32768.0
+            if v > 32767.0:
+                v = 32767.0
+            elif v < -32768.0:
+                v = -32768.0
+            out[i] = v
+else:
+    _quantize_pcm16 = None
+
+
+@functools.lru_cache(maxsize=2)
+def _load_model(model_path: str) -> Model:
+    """
+    Загружает модель Vosk (сотни МБ) один раз на путь.
+
+    Повторное создание SpeechToText с той же моделью (перезапуск бота
+    в том же процессе, тесты) не загружает граф заново.
+
+    Args:
+        model_path: Абсолютный путь к директории с моделью Vosk
+
+    Returns:
+        Model: Загруженная модель
+    """
+    return Model(model_path)
+
+
+class _StreamDecimator:
+    """
+    Потоковое понижение частоты в целое число раз.
+
+    Использует тот же FIR-фильтр, что и resample_poly, но хранит состояние
+    фильтра и фазу прореживания между блоками, поэтому аудио можно
+    обрабатывать по частям. Задержка фильтра - половина его длины
+    (менее миллисекунды), для распознавания она несущественна.
+    """
+
+    def __init__(self, down: int):
+        """
+        Args:
+            down: Во сколько раз понижается частота
+        """
+        half_len = 10 * down
+        self._taps = firwin(2 * half_len + 1, 1.0 / down, window=("kaiser", 5.0))
+        self._zi = np.zeros(len(self._taps) - 1)
+        self._down = down
+        self._phase = 0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Фильтрует и прореживает очередной блок.
+
+        Args:
+            block: Моно-отсчеты с исходной частотой
+
+        Returns:
+            np.ndarray: Отсчеты с пониженной частотой (float32)
+        """
+        filtered, self._zi = lfilter(self._taps, 1.0, block, zi=self._zi)
+        out = filtered[self._phase::self._down]
+        self._phase = (self._phase - len(filtered)) % self._down
+        return out.astype(np.float32)
+
 
 class SpeechToText:
     """
@@ -22,86 +110,252 @@ class SpeechToText:
     """
     
     SAMPLE_RATE = 16_000  # Частота дискретизации для Vosk
+    RECOGNIZER_POOL_SIZE = 4  # Сколько распознавателей держать для повторного использования
 
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, grammar: Optional[Sequence[str]] = None):
         """
         Инициализирует модель Vosk.
         
         Args:
             model_path: Путь к директории с моделью Vosk
+            grammar: Ожидаемые короткие фразы для распознавания с грамматикой
+                     (None или пустой список - режим отключен)
         """
         model_path = Path(model_path)
         if not model_path.exists():
             raise FileNotFoundError(f"Модель Vosk не найдена: {model_path}")
-        self.model = Model(str(model_path))
+        self.model = _load_model(str(model_path.resolve()))
+        # Пул готовых распознавателей: создание KaldiRecognizer не бесплатно
+        self._rec_pool: queue.LifoQueue = queue.LifoQueue(self.RECOGNIZER_POOL_SIZE)
+        # Распознаватель с ограниченным словарем для коротких фраз: граф
+        # декодирования сокращается до нескольких слов и работает намного быстрее.
+        # "[unk]" позволяет не подгонять посторонние слова под грамматику
+        self._grammar_rec: Optional[KaldiRecognizer] = None
+        self._grammar_lock = threading.Lock()
+        if grammar:
+            self._grammar_rec = KaldiRecognizer(
+                self.model,
+                self.SAMPLE_RATE,
+                json.dumps([*grammar, _UNK], ensure_ascii=False),
+            )
+            self._grammar_rec.SetWords(False)
         logging.info("Загружена модель Vosk из %s", model_path)
 
-    def transcribe_ogg_bytes(self, ogg_bytes: bytes) -> str:
+    @property
+    def has_grammar(self) -> bool:
+        """True, если настроено распознавание с грамматикой."""
+        return self._grammar_rec is not None
+
+    def transcribe_ogg_bytes(
+        self,
+        ogg_bytes: Union[bytes, bytearray, memoryview],
+        grammar: bool = False,
+        fast: bool = False,
+    ) -> str:
         """
-        Конвертирует OGG-аудио в WAV и транскрибирует его в текст.
+        Декодирует OGG-аудио в памяти и транскрибирует его в текст.
         
         Args:
-            ogg_bytes: Байты OGG/Opus файла
+            ogg_bytes: Байты OGG/Opus файла (или memoryview на них)
+            grammar: Распознавать с ограниченным словарем (если он настроен)
+            fast: Взять промежуточный результат без финального пересчета
+                  (для коротких голосовых)
             
         Returns:
             str: Транскрибированный текст
         """
-        with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as ogg:
-            ogg.write(ogg_bytes)
-            ogg_path = Path(ogg.name)
+        return self._transcribe(io.BytesIO(ogg_bytes), grammar, fast)
+
+    def transcribe_ogg_path(
+        self,
+        ogg_path: Union[str, Path],
+        grammar: bool = False,
+        fast: bool = False,
+    ) -> str:
+        """
+        Транскрибирует OGG-файл, уже сохраненный на диске.
         
-        wav_path = ogg_path.with_suffix(".wav")
-        self._ogg_to_wav(ogg_path, wav_path)
-        text = self._wav_to_text(wav_path)
+        Args:
+            ogg_path: Путь к OGG/Opus файлу
+            grammar: Распознавать с ограниченным словарем (если он настроен)
+            fast: Взять промежуточный результат без финального пересчета
+                  (для коротких голосовых)
+            
+        Returns:
+            str: Транскрибированный текст
+        """
+        return self._transcribe(str(ogg_path), grammar, fast)
+
+    def _transcribe(
+        self,
+        source: Union[str, BinaryIO],
+        grammar: bool = False,
+        fast: bool = False,
+    ) -> str:
+        """
+        Выбирает распознаватель и транскрибирует аудио.
         
-        # Удаляем временные файлы
-        ogg_path.unlink(missing_ok=True)
-        wav_path.unlink(missing_ok=True)
+        Args:
+            source: Путь к OGG файлу или файловый объект с его содержимым
+            grammar: Использовать распознаватель с грамматикой, если он есть
+            fast: Взять промежуточный результат без финального пересчета
+            
+        Returns:
+            str: Распознанный текст
+        """
+        if grammar and self._grammar_rec is not None:
+            # Распознаватель с грамматикой один, поэтому используется под блокировкой
+            with self._grammar_lock:
+                self._grammar_rec.Reset()
+                transcript = self._recognize(self._grammar_rec, source, fast)
+            # Слова вне грамматики распознаются как "[unk]" - отбрасываем их
+            transcript = " ".join(w for w in transcript.split() if w != _UNK)
+            if transcript:
+                return transcript
+            # Фраза не из грамматики: распознаем заново с полным словарем
+            logging.debug("Грамматика не подошла, распознаем с полным словарем")
+            if not isinstance(source, str):
+                source.seek(0)
         
-        return text
+        rec = self._acquire_recognizer()
+        try:
+            return self._recognize(rec, source, fast)
+        finally:
+            self._release_recognizer(rec)
 
-    def _ogg_to_wav(self, ogg_path: Path, wav_path: Path) -> None:
+    def _recognize(
+        self,
+        rec: KaldiRecognizer,
+        source: Union[str, BinaryIO],
+        fast: bool = False,
+    ) -> str:
         """
-        Конвертирует OGG/Opus → WAV 16 kHz mono PCM 16-bit
-        с помощью soundfile (libsndfile) и resampy.
+        Декодирует аудио по блокам и сразу подает их распознавателю,
+        так что распознавание идет параллельно с декодированием.
+        
+        В быстром режиме вместо FinalResult() берется PartialResult():
+        финальный пересчет гипотезы пропускается ценой небольшой потери точности.
         
         Args:
-            ogg_path: Путь к входному OGG файлу
-            wav_path: Путь для выходного WAV файла
+            rec: Распознаватель в начальном состоянии
+            source: Путь к OGG файлу или файловый объект с его содержимым
+            fast: Взять промежуточный результат без финального пересчета
+            
+        Returns:
+            str: Распознанный текст
         """
-        # 1. Читаем аудио (может быть стерео)
-        data, sr = sf.read(str(ogg_path))  # data: np.ndarray, sr: исходная частота
-
-        # 2. Приводим к моно, усредняя каналы
-        if data.ndim > 1:
-            data = data.mean(axis=1)
-
-        # 3. Ресемплируем, если исходная частота != 16 kHz
-        if sr != self.SAMPLE_RATE:
-            data = resampy.resample(data, sr, self.SAMPLE_RATE)
+        # Фразы, завершенные распознавателем по паузе (нужны только в быстром режиме)
+        phrases = []
+        with sf.SoundFile(source) as audio:
+            for pcm in self._iter_pcm16(audio):
+                if rec.AcceptWaveform(pcm) and fast:
+                    phrases.append(_json_loads(rec.Result()).get("text", ""))
+        if fast:
+            phrases.append(_json_loads(rec.PartialResult()).get("partial", ""))
+            transcript = " ".join(p for p in phrases if p)
+        else:
+            transcript = _json_loads(rec.FinalResult()).get("text", "")
+        
+        transcript = transcript.strip()
+        logging.debug("Транскрибировано %d символов", len(transcript))
+        return transcript
 
-        # 4. Записываем WAV с PCM 16-bit
-        sf.write(str(wav_path), data, self.SAMPLE_RATE, subtype='PCM_16')
-        logging.debug("Конвертирован файл %s в %s", ogg_path, wav_path)
+    def _iter_pcm16(self, audio: sf.SoundFile) -> Iterator[bytes]:
+        """
+        Декодирует OGG/Opus в PCM 16 kHz mono 16-bit блоками примерно по секунде
+        с помощью soundfile (libsndfile) и полифазного фильтра scipy.
+        
+        Понижение частоты в целое число раз (Opus всегда 48 kHz, т.е. в 3 раза)
+        выполняется потоково. Для прочих соотношений блоки накапливаются
+        и ресемплируются целиком.
+        
+        Args:
+            audio: Открытый аудиофайл
+            
+        Yields:
+            bytes: Сырые PCM-данные (int16, little-endian)
+        """
+        sr = audio.samplerate
+        g = gcd(sr, self.SAMPLE_RATE)
+        up, down = self.SAMPLE_RATE // g, sr // g
+        decimator = _StreamDecimator(down) if up == 1 and down > 1 else None
+        pending = []
+        # Буфер для моно-сигнала выделяется один раз на весь файл
+        mono_buf = np.empty(sr, dtype=np.float32) if audio.channels > 1 else None
+        # Как и буфер для квантования в PCM (блоки на выходе - около секунды)
+        pcm_buf = np.empty(self.SAMPLE_RATE, dtype=np.int16)
+        
+        # 1. Читаем аудио блоками по секунде сразу во float32
+        for block in audio.blocks(blocksize=sr, dtype="float32", always_2d=False):
+            # 2. Приводим к моно, усредняя каналы во float32 без новых массивов
+            if mono_buf is not None:
+                mono = mono_buf[:len(block)]
+                np.mean(block, axis=1, dtype=np.float32, out=mono)
+                block = mono
+            
+            # 3. Ресемплируем, если исходная частота != 16 kHz
+            if up == down:
+                yield self._to_pcm16(block, pcm_buf)
+            elif decimator is not None:
+                yield self._to_pcm16(decimator.process(block), pcm_buf)
+            else:
+                # Буфер переиспользуется, поэтому накопленный блок копируем
+                pending.append(block.copy() if mono_buf is not None else block)
+        
+        if pending:
+            data = resample_poly(np.concatenate(pending), up, down).astype(np.float32)
+            for start in range(0, len(data), self.SAMPLE_RATE):
+                yield self._to_pcm16(data[start:start + self.SAMPLE_RATE], pcm_buf)
 
-    def _wav_to_text(self, wav_path: Path) -> str:
+    @staticmethod
+    def _to_pcm16(data: np.ndarray, buf: Optional[np.ndarray] = None) -> bytes:
         """
-        Читает WAV и возвращает распознанный текст.
+        Квантует отсчеты float в PCM 16-bit.
+        
+        Если установлен numba, умножение, ограничение и приведение типа
+        выполняются одним циклом без временных массивов.
         
         Args:
-            wav_path: Путь к WAV файлу
+            data: Отсчеты в диапазоне [-1, 1]
+            buf: Переиспользуемый буфер int16; если он мал, выделяется новый
             
         Returns:
-            str: Распознанный текст
+            bytes: Сырые PCM-данные (int16, little-endian)
         """
-        rec = KaldiRecognizer(self.model, self.SAMPLE_RATE)
-        
-        with open(wav_path, "rb") as wf:
-            while chunk := wf.read(4000):
-                rec.AcceptWaveform(chunk)
+        n = len(data)
+        out = buf[:n] if buf is not None and len(buf) >= n else np.empty(n, dtype=np.int16)
+        if _quantize_pcm16 is not None:
+            _quantize_pcm16(data, out)
+        else:
+            np.copyto(out, np.clip(data * 32768, -32768, 32767), casting="unsafe")
+        # Vosk принимает только bytes, поэтому единственная копия - здесь
+        return out.tobytes()
+
+    def _acquire_recognizer(self) -> KaldiRecognizer:
+        """
+        Берет распознаватель из пула или создает новый, если пул пуст.
         
-        result = json.loads(rec.FinalResult())
-        transcript = result.get("text", "").strip()
+        Returns:
+            KaldiRecognizer: Распознаватель в начальном состоянии
+        """
+        try:
+            rec = self._rec_pool.get_nowait()
+        except queue.Empty:
+            rec = KaldiRecognizer(self.model, self.SAMPLE_RATE)
+            # Пословные отметки времени боту не нужны
+            rec.SetWords(False)
+            return rec
+        rec.Reset()
+        return rec
+
+    def _release_recognizer(self, rec: KaldiRecognizer) -> None:
+        """
+        Возвращает распознаватель в пул; лишние экземпляры отбрасываются.
         
-        logging.debug("Транскрибирован файл %s: %d символов", wav_path, len(transcript))
-        return transcript 
\ No newline at end of file
+        Args:
+            rec: Распознаватель, полученный из _acquire_recognizer
+        """
+        try:
+            self._rec_pool.put_nowait(rec)
+        except queue.Full:
+            pass
@@ -3,19 +3,27 @@
 Реализация на библиотеке aiogram.
 """
 
+import asyncio
 import datetime
+import html
 import logging
+import os
 import re
+import secrets
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Union, Any
 
+from aiohttp import web
 from aiogram import Bot, Dispatcher, Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.filters import Command, CommandObject
-from aiogram.filters.state import State, StatesGroup
-from aiogram.fsm.context import FSMContext
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.utils.chat_action import ChatActionSender
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
 from .config import Settings
 from .constants import (
@@ -31,21 +39,138 @@ from .constants import (
     MSG_NOTE_ADDED,
     MSG_START,
     MSG_SUMMARY_UPDATED,
-    MSG_VOICE_PROCESSING,
-    STATE_AWAITING_CHOICE,
-    SUMMARY_FOR_DATE_LINE_TEMPLATE,
-    SUMMARY_FOR_DATE_NOTE_TEMPLATE,
+    MSG_VOICE_TOO_LARGE,
+    MSG_VOICE_TOO_LONG,
     SUMMARY_REPLY_HEADER_TEMPLATE,
 )
 from .database import Database
 from .llm import LLMHandler
-from .models.schemas import UserState
 from .stt import SpeechToText
-from .utils import Utils
 
-# Определение состояний для FSM
-class EditStates(StatesGroup):
-    waiting_for_choice = State()
+logger = logging.getLogger(__name__)
+
+# Предкомпилированные регулярные выражения для разбора команд
+# ID - единственный аргумент /delete: "/delete 123", "/delete #123"
+_DELETE_MAIN_RE = re.compile(r"^/delete(?:@\w+)?\s+#?(\d+)\s*$")
+_LEAD_ID_RE = re.compile(r"^#(\d+)")
+
+KNOWN_RECORDS_CACHE_SIZE = 1024  # Размер кэша проверенных ID записей
+SUM_CHUNK_CHARS = 4000  # Максимальный размер части сводки (лимит Telegram - 4096)
+SUM_CHUNK_DELAY = 0.34  # Пауза между частями сводки: не больше 3 сообщений в секунду в чат
+GRAMMAR_MAX_SECONDS = 3  # Голосовые короче этого распознаются с грамматикой
+FAST_STT_MAX_SECONDS = 2  # Голосовые не длиннее этого распознаются без финального пересчета
+DEFAULT_LLM_CONCURRENCY = 4  # Одновременных запросов к LLM, если MAX_CONCURRENT_LLM=0
+WEBHOOK_LISTEN_HOST = "0.0.0.0"  # Адрес, на котором слушает webhook-сервер
+SUM_CACHE_TTL = 10  # Сколько секунд сводка /sum за день берется из кэша
+PENDING_EDIT_TTL = 300  # Сколько секунд ждать выбора действия с текстом ответа
+PENDING_EDITS_MAX = 1024  # Максимум текстов, одновременно ожидающих выбора
+
+# Callback-данные кнопок выбора действия: "<действие>:<токен>"
+_EDIT_CALLBACK_RE = re.compile(r"^(edit|note|cancel):")
+
+
+def _format_summary_row(row: Tuple[int, str, str, Optional[str]]) -> str:
+    """
+    Форматирует запись для сводки /sum.
+    
+    Используются f-строки вместо шаблонов с format: строка разбирается
+    при компиляции, а не при каждом вызове. Резюме и примечание
+    экранируются для разметки HTML.
+    
+    Args:
+        row: Кортеж (record_id, sent_at, summary, note)
+        
+    Returns:
+        str: Строка с резюме и, если есть, примечанием
+    """
+    record_id, sent_at, summary, note = row
+    if note:
+        return (
+            f"{sent_at} — #{record_id}: {html.escape(summary)}"
+            f"\n\n └ Примечание: {html.escape(note)}"
+        )
+    return f"{sent_at} — #{record_id}: {html.escape(summary)}"
+
+
+def _split_long_line(line: str, limit: int) -> List[str]:
+    """
+    Разрезает строку на части не длиннее limit.
+    
+    Разрез не попадает внутрь HTML-сущности (&amp;, &lt;, &#x27; и т.п.),
+    которые html.escape вставляет в резюме и примечания.
+    
+    Args:
+        line: Экранированная строка сводки
+        limit: Максимальная длина части
+        
+    Returns:
+        List[str]: Части строки
+    """
+    parts = []
+    while len(line) > limit:
+        cut = limit
+        # Сущности html.escape не длиннее 6 символов: ищем незакрытую "&" рядом с разрезом
+        amp = line.rfind("&", max(0, cut - 5), cut)
+        if amp > 0 and line.find(";", amp, cut) == -1:
+            cut = amp
+        parts.append(line[:cut])
+        line = line[cut:]
+    parts.append(line)
+    return parts
+
+
+def _split_chunks(lines: List[str], limit: int) -> List[str]:
+    """
+    Склеивает строки через пустую строку в части не длиннее limit.
+    
+    Строки по возможности не разрываются; строка длиннее limit
+    разрезается на несколько частей.
+    
+    Args:
+        lines: Строки сводки
+        limit: Максимальная длина части
+        
+    Returns:
+        List[str]: Части для отправки отдельными сообщениями
+    """
+    chunks = []
+    cur = ""
+    for line in lines:
+        if len(line) > limit:
+            if cur:
+                chunks.append(cur)
+            *head, cur = _split_long_line(line, limit)
+            chunks.extend(head)
+        elif cur and len(cur) + len(line) + 2 > limit:
+            chunks.append(cur)
+            cur = line
+        else:
+            cur = f"{cur}\n\n{line}" if cur else line
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def _edit_markup(token: str) -> InlineKeyboardMarkup:
+    """
+    Создает кнопки выбора действия с текстом ответа.
+    
+    Args:
+        token: Токен ожидающего выбора текста
+        
+    Returns:
+        InlineKeyboardMarkup: Кнопки с токеном в callback-данных
+    """
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text=BUTTON_TEXT_EDIT_SUMMARY, callback_data=f"edit:{token}"),
+                InlineKeyboardButton(text=BUTTON_TEXT_ADD_NOTE, callback_data=f"note:{token}"),
+            ],
+            [InlineKeyboardButton(text=BUTTON_TEXT_CANCEL, callback_data=f"cancel:{token}")],
+        ]
+    )
+
 
 class TelegramBot:
     """
@@ -76,52 +201,102 @@ class TelegramBot:
         self.llm = llm
         self.settings = settings
         
-        # Создаем экземпляры бота и диспетчера
-        self.bot = Bot(token=token, default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN))
-        self.dp = Dispatcher(storage=MemoryStorage())
+        # Число одновременно обрабатываемых голосовых ограничивается по стадиям.
+        # Распознавание загружает CPU: по умолчанию не больше половины ядер
+        # одновременно. Запросы к LLM ограничиваются отдельно, чтобы лишние
+        # задачи ждали на семафоре, а не в очереди пула потоков или модели
+        self._stt_sem = asyncio.Semaphore(
+            settings.MAX_CONCURRENT_STT or max(1, (os.cpu_count() or 1) // 2)
+        )
+        self._llm_sem = asyncio.Semaphore(
+            settings.MAX_CONCURRENT_LLM or DEFAULT_LLM_CONCURRENCY
+        )
+        
+        # LRU-кэш ID записей, существование которых уже проверено
+        self._known_records: "OrderedDict[int, None]" = OrderedDict()
+        
+        # Тексты ответов, ожидающие выбора действия, по токену из callback-данных:
+        # токен -> (время создания, ID пользователя, ID записи, текст).
+        # Кнопки сами несут токен, поэтому машина состояний FSM не нужна.
+        # Порядок вставки совпадает с порядком создания, поэтому устаревшие
+        # и лишние записи удаляются с начала; объем памяти ограничен
+        # PENDING_EDITS_MAX независимо от числа пользователей
+        self._pending_edits: "OrderedDict[str, Tuple[float, int, int, str]]" = OrderedDict()
+        
+        # Кэш записей для /sum: дата -> (время чтения, записи за день).
+        # Сбрасывается при каждом изменении записей, поэтому повторный /sum
+        # в течение SUM_CACHE_TTL не обращается к БД
+        self._sum_cache: Dict[str, Tuple[float, list]] = {}
+        # Счетчик изменений записей: /sum сохраняет результат в кэш, только
+        # если за время чтения из БД не было ни одной записи
+        self._sum_generation = 0
+        
+        # Создаем экземпляры бота и диспетчера. Сессия aiogram по умолчанию
+        # уже держит пул keep-alive соединений к Bot API
+        self.bot = Bot(
+            token=token,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        )
+        self.dp = Dispatcher()
+        self.router = Router(name="voice_memo")
         
         # Устанавливаем обработчики команд и сообщений
         self.setup_handlers()
         
-        logging.info("Telegram-бот инициализирован и готов к работе")
+        logger.info("Telegram-бот инициализирован и готов к работе")
 
     def setup_handlers(self):
-        """Настраивает обработчики сообщений и команд."""
+        """Настраивает обработчики сообщений и команд на роутере бота."""
+        router = self.router
         
         # Основные команды
-        self.dp.message.register(self.on_start, Command("start"))
-        self.dp.message.register(self.on_help, Command("help"))
-        self.dp.message.register(self.on_sum_command, Command("sum"))
-        self.dp.message.register(self.on_delete_command, Command("delete"))
+        router.message.register(self.on_start, Command("start"))
+        router.message.register(self.on_help, Command("help"))
+        router.message.register(self.on_sum_command, Command("sum"))
+        router.message.register(self.on_delete_command, Command("delete"))
         
         # Обработка голосовых сообщений
-        self.dp.message.register(self.on_voice, F.voice)
+        router.message.register(self.on_voice, F.voice)
+        
+        # Обработчик неизвестных команд. Зарегистрирован до обработчика ответов,
+        # поэтому тексты, начинающиеся с "/", проверяются только один раз
+        router.message.register(self.on_unknown_command, F.text.startswith("/"))
         
         # Обработка редактирования/добавления примечаний
-        self.dp.message.register(
+        router.message.register(
             self.on_reply_to_summary_for_edit,
-            F.reply_to_message & F.text & ~F.text.startswith("/")
+            F.reply_to_message & F.text
         )
         
-        # Обработка callback-запросов
-        self.dp.callback_query.register(
-            self.handle_edit_summary_callback, 
-            F.data == "edit", 
-            EditStates.waiting_for_choice
-        )
-        self.dp.callback_query.register(
-            self.handle_add_note_callback, 
-            F.data == "note", 
-            EditStates.waiting_for_choice
-        )
-        self.dp.callback_query.register(
-            self.handle_cancel_callback, 
-            F.data == "cancel", 
-            EditStates.waiting_for_choice
+        # Обработка нажатий на кнопки выбора действия
+        router.callback_query.register(
+            self.handle_edit_callback,
+            F.data.regexp(_EDIT_CALLBACK_RE)
         )
         
-        # Обработчик неизвестных команд
-        self.dp.message.register(self.on_unknown_command, F.text.startswith("/"))
+        self.dp.include_router(router)
+        
+        # Закрываем HTTP-клиенты LLM при остановке бота
+        self.dp.shutdown.register(self.llm.close)
+
+    def _remember_record(self, record_id: int) -> None:
+        """Запоминает ID существующей записи в LRU-кэше."""
+        self._known_records[record_id] = None
+        self._known_records.move_to_end(record_id)
+        if len(self._known_records) > KNOWN_RECORDS_CACHE_SIZE:
+            self._known_records.popitem(last=False)
+
+    def _forget_record(self, record_id: Optional[int] = None) -> None:
+        """Удаляет ID из кэша существующих записей (без аргумента - очищает кэш)."""
+        if record_id is None:
+            self._known_records.clear()
+        else:
+            self._known_records.pop(record_id, None)
+
+    def _invalidate_sum_cache(self) -> None:
+        """Сбрасывает кэш сводок /sum после изменения записей."""
+        self._sum_generation += 1
+        self._sum_cache.clear()
 
     async def on_start(self, message: Message):
         """Обработчик команды /start."""
@@ -146,68 +321,100 @@ class TelegramBot:
         5. Отправляет пользователю сообщение с резюме
         """
         user = message.from_user
+        uid, uname = user.id, user.username
         voice = message.voice
         file_id = voice.file_id
-        sent_at = Utils.now_utc()
         
-        logging.info(
+        # Слишком длинные и большие голосовые отклоняем по данным из самого
+        # обновления, не тратя время на скачивание, распознавание и LLM
+        max_seconds = self.settings.MAX_VOICE_SECONDS
+        if max_seconds and voice.duration > max_seconds:
+            await message.reply(
+                MSG_VOICE_TOO_LONG.format(duration=voice.duration, limit=max_seconds)
+            )
+            return
+        max_bytes = self.settings.MAX_VOICE_BYTES
+        if max_bytes and voice.file_size and voice.file_size > max_bytes:
+            await message.reply(MSG_VOICE_TOO_LARGE)
+            return
+        
+        # Короткие голосовые - команды и фразы из VOSK_GRAMMAR
+        use_grammar = self.stt.has_grammar and voice.duration < GRAMMAR_MAX_SECONDS
+        fast_stt = voice.duration <= FAST_STT_MAX_SECONDS
+        # Время отправки берем из самого сообщения (UTC): оно точнее момента
+        # обработки, если обновление дождалось своей очереди
+        sent_at = message.date.astimezone(datetime.timezone.utc).isoformat(timespec="seconds")
+        
+        logger.info(
             "Получено голосовое сообщение: file_id=%s | от=%s",
-            file_id, user.username or user.id
+            file_id, uname or uid
         )
         
-        # Сообщаем пользователю о начале обработки
-        processing_msg = await message.answer(MSG_VOICE_PROCESSING)
+        # Голосовое скачивается во временный файл, а не в память
+        fd, tmp_name = tempfile.mkstemp(suffix=".ogg")
+        os.close(fd)
+        ogg_path = Path(tmp_name)
         
+        # Пока идет обработка, в чате показывается статус "печатает..." -
+        # вместо отдельного сообщения о начале обработки и его последующего
+        # редактирования пользователь получает один ответ с резюме
         try:
-            # 1. Скачиваем голосовое сообщение
-            file = await self.bot.get_file(file_id)
-            file_path = file.file_path
-            ogg_bytes = await self.bot.download_file(file_path)
-            
-            # 2. Транскрибируем
-            text = self.stt.transcribe_ogg_bytes(ogg_bytes.getvalue())
-            logging.info("Транскрибировано %d символов", len(text))
-            
-            # Если текст слишком короткий или пустой, сообщаем об ошибке
-            if len(text) < 5:
-                await self.bot.edit_message_text(
-                    "Не удалось распознать текст. Пожалуйста, попробуйте еще раз.",
-                    chat_id=message.chat.id,
-                    message_id=processing_msg.message_id
+            async with ChatActionSender.typing(bot=self.bot, chat_id=message.chat.id):
+                # 1. Скачиваем голосовое сообщение
+                file = await self.bot.get_file(file_id)
+                file_path = file.file_path
+                await self.bot.download_file(file_path, destination=ogg_path)
+                
+                # Блокирующие STT и LLM выполняем в потоках, чтобы не останавливать
+                # цикл событий; семафоры ограничивают число параллельных задач.
+                # 2. Транскрибируем
+                async with self._stt_sem:
+                    text = await asyncio.to_thread(
+                        self.stt.transcribe_ogg_path, ogg_path, use_grammar, fast_stt
+                    )
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Транскрибировано %d символов", len(text))
+                
+                # Если текст слишком короткий или пустой, сообщаем об ошибке
+                if len(text) < 5:
+                    await message.reply(
+                        "Не удалось распознать текст. Пожалуйста, попробуйте еще раз."
+                    )
+                    return
+                
+                # 3. Суммаризируем
+                async with self._llm_sem:
+                    summary = await self.llm.summarize(text)
+                
+                # 4. Сохраняем в БД
+                record_id = await asyncio.to_thread(
+                    self.db.save_message,
+                    telegram_file_id=file_id,
+                    text=text,
+                    summary=summary,
+                    sent_at=sent_at,
+                    user_id=uid,
+                    username=uname,
                 )
-                return
-            
-            # 3. Суммаризируем
-            summary = self.llm.summarize(text)
-            
-            # 4. Сохраняем в БД
-            record_id = self.db.save_message(
-                telegram_file_id=file_id,
-                text=text,
-                summary=summary,
-                sent_at=sent_at,
-                user_id=user.id,
-                username=user.username,
-            )
+                self._remember_record(record_id)
+                self._invalidate_sum_cache()
             
-            # 5. Отвечаем пользователю
-            await self.bot.edit_message_text(
+            # 5. Отвечаем пользователю на его голосовое
+            await message.reply(
                 SUMMARY_REPLY_HEADER_TEMPLATE.format(
                     record_id=record_id,
-                    summary=summary
-                ),
-                chat_id=message.chat.id,
-                message_id=processing_msg.message_id,
-                reply_to_message_id=message.message_id
+                    summary=html.escape(summary)
+                )
             )
             
-        except Exception as e:
-            logging.exception("Ошибка при обработке голосового сообщения: %s", e)
-            await self.bot.edit_message_text(
-                "Произошла ошибка при обработке сообщения. Пожалуйста, попробуйте позже.",
-                chat_id=message.chat.id,
-                message_id=processing_msg.message_id
+        except Exception:
+            # Трассировка уже содержит текст исключения, отдельно его не форматируем
+            logger.exception("Ошибка при обработке голосового сообщения")
+            await message.reply(
+                "Произошла ошибка при обработке сообщения. Пожалуйста, попробуйте позже."
             )
+        finally:
+            ogg_path.unlink(missing_ok=True)
 
     async def on_sum_command(self, message: Message, command: CommandObject = None):
         """
@@ -215,40 +422,51 @@ class TelegramBot:
         Выводит сводку всех резюме за указанную дату.
         """
         if command and command.args:
-            date_str = command.args
-            # Проверяем формат даты
-            if not re.match(r"^\d{4}-\d{2}-\d{2}$", date_str):
+            # Проверяем формат даты: строго YYYY-MM-DD. fromisoformat в Python 3.11+
+            # принимает и другие формы ISO 8601 (20261015, 2026-W42-4), а strptime
+            # без проверки длины - числа без ведущих нулей (2026-1-5)
+            arg = command.args.strip()
+            try:
+                if len(arg) != 10:
+                    raise ValueError(arg)
+                date_obj = datetime.datetime.strptime(arg, "%Y-%m-%d").date()
+            except ValueError:
                 await message.answer(MSG_DATE_FORMAT_ERROR)
                 return
         else:
             # По умолчанию - текущая дата
-            date_str = datetime.datetime.now().date().isoformat()
-        
-        # Получаем из БД записи за указанную дату
-        summaries = self.db.fetch_summaries_by_date(date_str)
-        
-        if not summaries:
+            date_obj = datetime.date.today()
+        date_str = date_obj.isoformat()
+        
+        # Записи за день берем из кэша или читаем в потоке, чтобы не
+        # блокировать цикл событий
+        now = time.monotonic()
+        cached = self._sum_cache.get(date_str)
+        if cached is not None and now - cached[0] < SUM_CACHE_TTL:
+            rows = cached[1]
+        else:
+            generation = self._sum_generation
+            rows = await asyncio.to_thread(list, self.db.fetch_summaries_by_date(date_str))
+            # Если во время чтения записи менялись, результат мог устареть -
+            # отвечаем им, но в кэш не кладем
+            if generation == self._sum_generation:
+                # Заодно удаляем устаревшие записи, чтобы кэш не рос по числу дат
+                for key in [k for k, (ts, _) in self._sum_cache.items() if now - ts >= SUM_CACHE_TTL]:
+                    del self._sum_cache[key]
+                self._sum_cache[date_str] = (now, rows)
+        
+        if not rows:
             await message.answer(MSG_NO_SUMMARIES_FOR_DATE.format(date_str=date_str))
             return
         
-        # Формируем сводку
-        lines = []
-        for record_id, sent_at, summary, note in summaries:
-            # Основная строка с резюме
-            line = SUMMARY_FOR_DATE_LINE_TEMPLATE.format(
-                sent_at=sent_at,
-                record_id=record_id,
-                summary=summary
-            )
-            lines.append(line)
-            
-            # Если есть примечание, добавляем его
-            if note:
-                note_line = SUMMARY_FOR_DATE_NOTE_TEMPLATE.format(note=note)
-                lines.append(note_line)
-        
-        # Отправляем сводку пользователю
-        await message.answer("\n\n".join(lines))
+        # Формируем сводку; если она не помещается в одно сообщение Telegram,
+        # отправляем частями по границам записей. Части идут последовательно
+        # с паузой, чтобы не упереться в ограничение частоты сообщений в чат
+        chunks = _split_chunks(list(map(_format_summary_row, rows)), SUM_CHUNK_CHARS)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(SUM_CHUNK_DELAY)
+            await message.answer(chunk)
 
     async def on_delete_command(self, message: Message):
         """
@@ -261,11 +479,13 @@ class TelegramBot:
         """
         text = message.text.strip()
         
-        # Способ 1: По явно указанному ID
-        match = re.search(r"#?(\d+)$", text)
+        # Способ 1: По явно указанному ID ("123" или "#123")
+        match = _DELETE_MAIN_RE.match(text)
         if match:
             record_id = int(match.group(1))
-            if self.db.delete_record_by_id(record_id):
+            self._forget_record(record_id)
+            if await asyncio.to_thread(self.db.delete_record_by_id, record_id):
+                self._invalidate_sum_cache()
                 await message.answer(MSG_DELETE_SUCCESS.format(record_id=record_id))
             else:
                 await message.answer(MSG_DELETE_NOT_FOUND)
@@ -278,7 +498,9 @@ class TelegramBot:
             # Способ 2: Ответ на голосовое сообщение
             if reply.voice:
                 file_id = reply.voice.file_id
-                if self.db.delete_record_by_telegram_file_id(file_id):
+                self._forget_record()  # ID записи неизвестен - сбрасываем кэш
+                if await asyncio.to_thread(self.db.delete_record_by_telegram_file_id, file_id):
+                    self._invalidate_sum_cache()
                     await message.answer("✅ Запись удалена.")
                 else:
                     await message.answer(MSG_DELETE_NOT_FOUND)
@@ -286,10 +508,12 @@ class TelegramBot:
                 
             # Способ 3: Ответ на сообщение с резюме (извлечение #ID)
             if reply.text:
-                match = re.search(r"^#(\d+)", reply.text)
+                match = _LEAD_ID_RE.match(reply.text)
                 if match:
                     record_id = int(match.group(1))
-                    if self.db.delete_record_by_id(record_id):
+                    self._forget_record(record_id)
+                    if await asyncio.to_thread(self.db.delete_record_by_id, record_id):
+                        self._invalidate_sum_cache()
                         await message.answer(MSG_DELETE_SUCCESS.format(record_id=record_id))
                     else:
                         await message.answer(MSG_DELETE_NOT_FOUND)
@@ -304,15 +528,17 @@ class TelegramBot:
             "3. Ответом на сообщение с резюме"
         )
 
-    async def on_reply_to_summary_for_edit(self, message: Message, state: FSMContext):
+    async def on_reply_to_summary_for_edit(self, message: Message):
         """
         Начало диалога редактирования/добавления примечания.
         Вызывается, когда пользователь отвечает на сообщение с резюме.
         """
         reply = message.reply_to_message
         
-        # Проверяем, что ответ на сообщение с резюме (начинается с #ID)
-        if not reply or not reply.text or not re.match(r"^#\d+", reply.text):
+        # Проверяем, что ответ на сообщение с резюме (начинается с #ID);
+        # одно сопоставление служит и проверкой, и извлечением ID
+        match = _LEAD_ID_RE.match(reply.text or "") if reply else None
+        if not match:
             await message.answer(
                 "Чтобы отредактировать резюме или добавить примечание, "
                 "ответьте на сообщение с резюме (которое начинается с #ID)."
@@ -320,103 +546,147 @@ class TelegramBot:
             return
         
         # Извлекаем ID записи
-        match = re.match(r"^#(\d+)", reply.text)
         record_id = int(match.group(1))
         
-        # Получаем запись из БД для проверки
-        record = self.db.fetch_record_by_id(record_id)
-        if not record:
+        # Проверяем существование записи (сначала по кэшу, затем в БД)
+        if record_id in self._known_records:
+            self._known_records.move_to_end(record_id)
+        elif await asyncio.to_thread(self.db.fetch_record_by_id, record_id):
+            self._remember_record(record_id)
+        else:
             await message.answer(MSG_DELETE_NOT_FOUND)
             return
         
-        # Сохраняем данные в состоянии для использования в следующих шагах
-        await state.set_state(EditStates.waiting_for_choice)
-        await state.update_data(record_id=record_id, new_text=message.text)
-        
-        # Создаем кнопки выбора действия
-        keyboard = [
-            [
-                InlineKeyboardButton(text=BUTTON_TEXT_EDIT_SUMMARY, callback_data="edit"),
-                InlineKeyboardButton(text=BUTTON_TEXT_ADD_NOTE, callback_data="note"),
-            ],
-            [InlineKeyboardButton(text=BUTTON_TEXT_CANCEL, callback_data="cancel")],
-        ]
-        markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
+        # Запоминаем текст под коротким токеном, который передается в кнопках
+        now = time.monotonic()
+        self._prune_pending_edits(now)
+        token = secrets.token_urlsafe(8)
+        self._pending_edits[token] = (now, message.from_user.id, record_id, message.text)
         
         # Отправляем сообщение с запросом действия
         await message.answer(
             MSG_EDIT_OR_ADD_NOTE_PROMPT,
-            reply_markup=markup
+            reply_markup=_edit_markup(token)
         )
 
-    async def handle_edit_summary_callback(self, callback_query: CallbackQuery, state: FSMContext):
+    def _prune_pending_edits(self, now: float) -> None:
         """
-        Обработчик нажатия на кнопку "Изменить резюме".
+        Удаляет тексты, ожидающие выбора дольше PENDING_EDIT_TTL, и самые
+        старые, если их больше PENDING_EDITS_MAX - 1 (освобождая место для нового).
         """
-        await callback_query.answer()
-        
-        # Получаем данные из состояния
-        data = await state.get_data()
-        record_id = data.get("record_id")
-        new_text = data.get("new_text")
-        
-        if record_id and new_text:
-            # Обновляем резюме в БД
-            if self.db.update_summary(record_id, new_text):
-                await callback_query.message.edit_text(MSG_SUMMARY_UPDATED)
-            else:
-                await callback_query.message.edit_text(MSG_DELETE_NOT_FOUND)
-        else:
-            await callback_query.message.edit_text("Произошла ошибка. Пожалуйста, попробуйте снова.")
-        
-        # Очищаем состояние
-        await state.clear()
+        pending = self._pending_edits
+        while pending:
+            created = next(iter(pending.values()))[0]
+            if now - created <= PENDING_EDIT_TTL and len(pending) < PENDING_EDITS_MAX:
+                break
+            pending.popitem(last=False)
 
-    async def handle_add_note_callback(self, callback_query: CallbackQuery, state: FSMContext):
+    async def handle_edit_callback(self, callback_query: CallbackQuery):
         """
-        Обработчик нажатия на кнопку "Добавить примечание".
+        Обработчик нажатия на кнопки "Изменить резюме", "Добавить примечание"
+        и "Отмена". Действие и токен текста берутся из callback-данных.
         """
         await callback_query.answer()
         
-        # Получаем данные из состояния
-        data = await state.get_data()
-        record_id = data.get("record_id")
-        note_text = data.get("new_text")
+        action, _, token = callback_query.data.partition(":")
+        pending = self._pending_edits.get(token)
+        # Кнопки может нажать только автор ответа; чужое нажатие игнорируем
+        if pending is not None and pending[1] != callback_query.from_user.id:
+            return
+        self._pending_edits.pop(token, None)
+        
+        if action == "cancel":
+            await callback_query.message.edit_text("Операция отменена.")
+            return
         
-        if record_id and note_text:
-            # Добавляем примечание в БД
-            if self.db.add_note_to_record(record_id, note_text):
-                await callback_query.message.edit_text(MSG_NOTE_ADDED)
-            else:
-                await callback_query.message.edit_text(MSG_DELETE_NOT_FOUND)
-        else:
+        if pending is None or time.monotonic() - pending[0] > PENDING_EDIT_TTL:
             await callback_query.message.edit_text("Произошла ошибка. Пожалуйста, попробуйте снова.")
+            return
         
-        # Очищаем состояние
-        await state.clear()
-
-    async def handle_cancel_callback(self, callback_query: CallbackQuery, state: FSMContext):
-        """
-        Обработчик нажатия на кнопку "Отмена".
-        """
-        await callback_query.answer()
-        await callback_query.message.edit_text("Операция отменена.")
+        _, _, record_id, new_text = pending
+        if action == "edit":
+            # Обновляем резюме в БД
+            ok = await asyncio.to_thread(self.db.update_summary, record_id, new_text)
+            done_text = MSG_SUMMARY_UPDATED
+        else:
+            # Добавляем примечание в БД
+            ok = await asyncio.to_thread(self.db.add_note_to_record, record_id, new_text)
+            done_text = MSG_NOTE_ADDED
         
-        # Очищаем состояние
-        await state.clear()
+        if ok:
+            self._invalidate_sum_cache()
+            await callback_query.message.edit_text(done_text)
+        else:
+            self._forget_record(record_id)
+            await callback_query.message.edit_text(MSG_DELETE_NOT_FOUND)
 
     async def start(self):
         """Запускает бота."""
-        logging.info("Запуск бота...")
-        await self.dp.start_polling(self.bot)
+        logger.info("Запуск бота...")
+        # Если раньше был установлен webhook, getUpdates не будет работать
+        await self.bot.delete_webhook()
+        # Long polling: getUpdates ждет новых событий на стороне Telegram.
+        # Запрашиваем только те типы обновлений, для которых есть обработчики.
+        # Общий лимит задач не задаем: aiogram ждет свободного слота до разбора
+        # следующего обновления, и голосовые, ожидающие семафоров, блокировали
+        # бы команды. Тяжелая работа ограничена семафорами в on_voice
+        await self.dp.start_polling(
+            self.bot,
+            polling_timeout=30,
+            handle_as_tasks=True,
+            allowed_updates=self.dp.resolve_used_update_types(),
+        )
 
-    def run(self):
-        """Запускает бота в блокирующем режиме."""
-        import asyncio
+    async def _on_webhook_startup(self, bot: Bot) -> None:
+        """Регистрирует webhook в Telegram при запуске сервера."""
+        await bot.set_webhook(
+            url=self.settings.WEBHOOK_URL,
+            secret_token=self.settings.WEBHOOK_SECRET_TOKEN or None,
+            allowed_updates=self.dp.resolve_used_update_types(),
+        )
+        logger.info("Webhook установлен: %s", self.settings.WEBHOOK_URL)
+
+    def _run_webhook(self) -> None:
+        """
+        Запускает HTTP-сервер, принимающий обновления от Telegram.
         
-        logging.info("Запуск бота (Ctrl+C для выхода)...")
+        В отличие от long polling, бот не держит постоянный запрос getUpdates:
+        Telegram сам отправляет каждое обновление, как только оно появляется.
+        Обновления обрабатываются в фоновых задачах, ответ Telegram - сразу.
+        """
+        settings = self.settings
+        self.dp.startup.register(self._on_webhook_startup)
+        
+        app = web.Application()
+        SimpleRequestHandler(
+            dispatcher=self.dp,
+            bot=self.bot,
+            secret_token=settings.WEBHOOK_SECRET_TOKEN or None,
+        ).register(app, path=settings.WEBHOOK_PATH)
+        setup_application(app, self.dp, bot=self.bot)
+        
+        logger.info(
+            "Запуск webhook-сервера на %s:%d%s",
+            WEBHOOK_LISTEN_HOST, settings.WEBHOOK_PORT, settings.WEBHOOK_PATH
+        )
+        web.run_app(
+            app,
+            host=WEBHOOK_LISTEN_HOST,
+            port=settings.WEBHOOK_PORT,
+            print=None,
+        )
+
+    def run(self):
+        """Запускает бота в блокирующем режиме (webhook или long polling)."""
+        logger.info("Запуск бота (Ctrl+C для выхода)...")
         
         try:
-            asyncio.run(self.start())
+            if self.settings.WEBHOOK_URL:
+                self._run_webhook()
+            else:
+                asyncio.run(self.start())
         except (KeyboardInterrupt, SystemExit):
-            logging.info("Бот остановлен.") 
\ No newline at end of file
+            logger.info("Бот остановлен.")
+        finally:
+            # Дожидаемся записи сохранений из очереди и закрываем соединения
+            self.db.close()
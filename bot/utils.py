@@ -2,11 +2,29 @@
 Вспомогательные утилиты для проекта.
 """
 
+import atexit
 import datetime
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Union
 
+_UTC = datetime.timezone.utc
+_now = datetime.datetime.now
+
+# Строковые значения, которые считаются истинными
+_TRUTHY = frozenset(("1", "true", "yes", "on"))
+
+# Логгеры библиотек, которые пишут INFO на каждое обновление или запрос
+_NOISY_LOGGERS = (
+    "aiogram.event",
+    "aiogram.dispatcher",
+    "aiohttp.access",
+    "httpx",
+    "httpcore",
+)
+
 
 class Utils:
     """Набор вспомогательных статических методов."""
@@ -14,7 +32,7 @@ class Utils:
     @staticmethod
     def now_utc() -> str:
         """Возвращает текущее время в UTC в формате ISO-8601 (без микросекунд)."""
-        return datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0).isoformat()
+        return _now(_UTC).isoformat(timespec="seconds")
 
     @staticmethod
     def ensure_parent(path: Path) -> None:
@@ -24,9 +42,13 @@ class Utils:
     @staticmethod
     def as_bool(value: Union[str, bool, None]) -> bool:
         """Преобразует строковое или другое значение в булево."""
+        if isinstance(value, str):
+            return value.strip().lower() in _TRUTHY
         if isinstance(value, bool):
             return value
-        return str(value).strip().lower() in {"1", "true", "yes", "on"}
+        if value is None:
+            return False
+        return str(value).strip().lower() in _TRUTHY
 
 
 def configure_logging(log_path: str, log_level: str = "INFO") -> None:
@@ -43,17 +65,26 @@ def configure_logging(log_path: str, log_level: str = "INFO") -> None:
     # Устанавливаем уровень логирования
     level = getattr(logging, log_level.upper(), logging.INFO)
     
-    # Настраиваем формат и обработчики
+    # Запись в файл и консоль выполняется в фоновом потоке: обработчики
+    # в цикле событий только кладут запись в очередь
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(
+        log_queue,
+        logging.FileHandler(log_path, encoding="utf-8"),
+        logging.StreamHandler(),
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    
+    # Настраиваем формат и обработчики. Сообщение форматируется в QueueHandler,
+    # поэтому обработчикам слушателя отдельный формат не нужен
     fmt = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
     logging.basicConfig(
         level=level,
         format=fmt,
-        handlers=[
-            logging.FileHandler(log_path, encoding="utf-8"),
-            logging.StreamHandler(),
-        ],
+        handlers=[QueueHandler(log_queue)],
     )
     
     # Устанавливаем уровень для некоторых "шумных" логгеров
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-    logging.getLogger("telegram").setLevel(logging.WARNING) 
\ No newline at end of file
+    for name in _NOISY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING) 
\ No newline at end of file